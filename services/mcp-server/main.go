@@ -4,16 +4,21 @@ import (
 	"database/sql"
 	"encoding/json"
 	"fmt"
+	"io"
 	"log"
 	"net/http"
 	"os"
 	"strconv"
 	"strings"
+	"sync"
 	"time"
 
 	_ "github.com/lib/pq"
 )
 
+// Maximum number of tool calls accepted in a single batch request
+const maxBatchSize = 64
+
 // MCP Tool definitions for Claude
 type MCPTool struct {
 	Name        string                 `json:"name"`
@@ -26,6 +31,14 @@ type MCPRequest struct {
 	Arguments map[string]interface{} `json:"arguments"`
 }
 
+type MCPBatchRequest struct {
+	Batch []MCPRequest `json:"batch"`
+}
+
+type MCPBatchResponse struct {
+	Results []MCPResponse `json:"results"`
+}
+
 type MCPResponse struct {
 	Content []MCPContent `json:"content"`
 	IsError bool         `json:"isError,omitempty"`
@@ -54,6 +67,7 @@ func main() {
 	// Setup HTTP routes for MCP
 	http.HandleFunc("/mcp/tools", toolsHandler)
 	http.HandleFunc("/mcp/call", callHandler)
+	http.HandleFunc("/mcp/batch", batchHandler)
 	http.HandleFunc("/health", healthHandler)
 	http.HandleFunc("/ready", readyHandler)
 
@@ -66,9 +80,20 @@ func main() {
 	log.Printf("📡 MCP Endpoints:")
 	log.Printf("  • Tools list: GET http://localhost:%s/mcp/tools", port)
 	log.Printf("  • Tool calls: POST http://localhost:%s/mcp/call", port)
+	log.Printf("  • Batched tool calls: POST http://localhost:%s/mcp/batch", port)
 	log.Printf("  • Health: GET http://localhost:%s/health", port)
 
-	log.Fatal(http.ListenAndServe(":"+port, nil))
+	// Accept HTTP/2 without TLS (h2c) so local MCP clients can multiplex calls
+	protocols := new(http.Protocols)
+	protocols.SetHTTP1(true)
+	protocols.SetUnencryptedHTTP2(true)
+
+	server := &http.Server{
+		Addr:      ":" + port,
+		Protocols: protocols,
+	}
+
+	log.Fatal(server.ListenAndServe())
 }
 
 func toolsHandler(w http.ResponseWriter, r *http.Request) {
@@ -177,19 +202,74 @@ func callHandler(w http.ResponseWriter, r *http.Request) {
 
 	log.Printf("🔧 MCP Tool call: %s with args: %v", req.Name, req.Arguments)
 
-	var response MCPResponse
+	response := dispatchTool(req)
+
+	// Clients asking for text/plain get the bare result text on success;
+	// errors are always JSON and flagged with X-Selin-Error
+	if !response.IsError && len(response.Content) > 0 && strings.Contains(r.Header.Get("Accept"), "text/plain") {
+		w.Header().Set("Content-Type", "text/plain; charset=utf-8")
+		io.WriteString(w, response.Content[0].Text)
+		return
+	}
+
+	if response.IsError {
+		w.Header().Set("X-Selin-Error", "1")
+	}
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(response)
+}
+
+func batchHandler(w http.ResponseWriter, r *http.Request) {
+	if r.Method != http.MethodPost {
+		http.Error(w, "Method not allowed", http.StatusMethodNotAllowed)
+		return
+	}
+
+	var req MCPBatchRequest
+	if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+		respondWithError(w, fmt.Sprintf("Invalid request: %v", err))
+		return
+	}
+
+	if len(req.Batch) == 0 {
+		respondWithError(w, "Batch must contain at least one tool call")
+		return
+	}
+	if len(req.Batch) > maxBatchSize {
+		respondWithError(w, fmt.Sprintf("Batch exceeds maximum size of %d", maxBatchSize))
+		return
+	}
+
+	log.Printf("🔧 MCP Batch call: %d tools", len(req.Batch))
+
+	// Run the calls concurrently; results keep the order of the request
+	results := make([]MCPResponse, len(req.Batch))
+	var wg sync.WaitGroup
+	for i, call := range req.Batch {
+		wg.Add(1)
+		go func(i int, call MCPRequest) {
+			defer wg.Done()
+			results[i] = dispatchTool(call)
+		}(i, call)
+	}
+	wg.Wait()
+
+	w.Header().Set("Content-Type", "application/json")
+	json.NewEncoder(w).Encode(MCPBatchResponse{Results: results})
+}
 
+func dispatchTool(req MCPRequest) MCPResponse {
 	switch req.Name {
 	case "search_content":
-		response = handleSearchContent(req.Arguments)
+		return handleSearchContent(req.Arguments)
 	case "get_learning_progress":
-		response = handleGetLearningProgress(req.Arguments)
+		return handleGetLearningProgress(req.Arguments)
 	case "get_recent_content":
-		response = handleGetRecentContent(req.Arguments)
+		return handleGetRecentContent(req.Arguments)
 	case "analyze_content_trends":
-		response = handleAnalyzeTrends(req.Arguments)
+		return handleAnalyzeTrends(req.Arguments)
 	default:
-		response = MCPResponse{
+		return MCPResponse{
 			Content: []MCPContent{{
 				Type: "text",
 				Text: fmt.Sprintf("Unknown tool: %s", req.Name),
@@ -197,9 +277,6 @@ func callHandler(w http.ResponseWriter, r *http.Request) {
 			IsError: true,
 		}
 	}
-
-	w.Header().Set("Content-Type", "application/json")
-	json.NewEncoder(w).Encode(response)
 }
 
 func handleSearchContent(args map[string]interface{}) MCPResponse {
@@ -503,6 +580,7 @@ func errorResponse(message string) MCPResponse {
 func respondWithError(w http.ResponseWriter, message string) {
 	log.Printf("❌ MCP Error: %s", message)
 	response := errorResponse(message)
+	w.Header().Set("X-Selin-Error", "1")
 	w.Header().Set("Content-Type", "application/json")
 	w.WriteHeader(http.StatusBadRequest)
 	json.NewEncoder(w).Encode(response)
@@ -0,0 +1,169 @@
+package main
+
+import (
+	"bytes"
+	"encoding/json"
+	"fmt"
+	"net/http"
+	"net/http/httptest"
+	"testing"
+)
+
+func postBatch(t *testing.T, batch MCPBatchRequest) *httptest.ResponseRecorder {
+	t.Helper()
+
+	jsonBody, _ := json.Marshal(batch)
+	req, err := http.NewRequest("POST", "/mcp/batch", bytes.NewBuffer(jsonBody))
+	if err != nil {
+		t.Fatal(err)
+	}
+	req.Header.Set("Content-Type", "application/json")
+
+	rr := httptest.NewRecorder()
+	handler := http.HandlerFunc(batchHandler)
+	handler.ServeHTTP(rr, req)
+	return rr
+}
+
+func TestBatchHandlerPreservesOrder(t *testing.T) {
+	// These calls all fail before touching the database, so no DB is needed
+	batch := MCPBatchRequest{Batch: []MCPRequest{
+		{Name: "tool_a", Arguments: map[string]interface{}{}},
+		{Name: "search_content", Arguments: map[string]interface{}{}},
+		{Name: "tool_b", Arguments: map[string]interface{}{}},
+		{Name: "get_learning_progress", Arguments: map[string]interface{}{}},
+		{Name: "tool_c", Arguments: map[string]interface{}{}},
+	}}
+
+	rr := postBatch(t, batch)
+
+	if status := rr.Code; status != http.StatusOK {
+		t.Fatalf("handler returned wrong status code: got %v want %v", status, http.StatusOK)
+	}
+
+	var response MCPBatchResponse
+	if err := json.NewDecoder(rr.Body).Decode(&response); err != nil {
+		t.Fatalf("failed to decode response: %v", err)
+	}
+
+	want := []string{
+		"Unknown tool: tool_a",
+		"❌ Error: Query parameter is required",
+		"Unknown tool: tool_b",
+		"❌ Error: Topic parameter is required",
+		"Unknown tool: tool_c",
+	}
+	if len(response.Results) != len(want) {
+		t.Fatalf("expected %d results, got %d", len(want), len(response.Results))
+	}
+	for i, result := range response.Results {
+		if !result.IsError {
+			t.Errorf("result %d: expected isError", i)
+		}
+		if got := result.Content[0].Text; got != want[i] {
+			t.Errorf("result %d: got %q want %q", i, got, want[i])
+		}
+	}
+}
+
+func TestBatchHandlerEmptyBatch(t *testing.T) {
+	rr := postBatch(t, MCPBatchRequest{})
+
+	if status := rr.Code; status != http.StatusBadRequest {
+		t.Errorf("handler returned wrong status code: got %v want %v", status, http.StatusBadRequest)
+	}
+	if rr.Header().Get("X-Selin-Error") != "1" {
+		t.Error("expected X-Selin-Error header")
+	}
+}
+
+func TestBatchHandlerTooLarge(t *testing.T) {
+	var batch MCPBatchRequest
+	for i := 0; i <= maxBatchSize; i++ {
+		batch.Batch = append(batch.Batch, MCPRequest{Name: fmt.Sprintf("tool_%d", i)})
+	}
+
+	rr := postBatch(t, batch)
+
+	if status := rr.Code; status != http.StatusBadRequest {
+		t.Errorf("handler returned wrong status code: got %v want %v", status, http.StatusBadRequest)
+	}
+	if rr.Header().Get("X-Selin-Error") != "1" {
+		t.Error("expected X-Selin-Error header")
+	}
+}
+
+func TestBatchHandlerInvalidMethod(t *testing.T) {
+	req, err := http.NewRequest("GET", "/mcp/batch", nil)
+	if err != nil {
+		t.Fatal(err)
+	}
+
+	rr := httptest.NewRecorder()
+	handler := http.HandlerFunc(batchHandler)
+	handler.ServeHTTP(rr, req)
+
+	if status := rr.Code; status != http.StatusMethodNotAllowed {
+		t.Errorf("handler returned wrong status code: got %v want %v", status, http.StatusMethodNotAllowed)
+	}
+}
+
+func postCall(t *testing.T, call MCPRequest, accept string) *httptest.ResponseRecorder {
+	t.Helper()
+
+	jsonBody, _ := json.Marshal(call)
+	req, err := http.NewRequest("POST", "/mcp/call", bytes.NewBuffer(jsonBody))
+	if err != nil {
+		t.Fatal(err)
+	}
+	req.Header.Set("Content-Type", "application/json")
+	if accept != "" {
+		req.Header.Set("Accept", accept)
+	}
+
+	rr := httptest.NewRecorder()
+	handler := http.HandlerFunc(callHandler)
+	handler.ServeHTTP(rr, req)
+	return rr
+}
+
+func TestCallHandlerErrorIsJSONEvenWhenTextRequested(t *testing.T) {
+	rr := postCall(t, MCPRequest{Name: "no_such_tool"}, "text/plain, application/json")
+
+	if status := rr.Code; status != http.StatusOK {
+		t.Errorf("handler returned wrong status code: got %v want %v", status, http.StatusOK)
+	}
+	if got := rr.Header().Get("Content-Type"); got != "application/json" {
+		t.Errorf("expected application/json, got %q", got)
+	}
+	if rr.Header().Get("X-Selin-Error") != "1" {
+		t.Error("expected X-Selin-Error header")
+	}
+
+	var response MCPResponse
+	if err := json.NewDecoder(rr.Body).Decode(&response); err != nil {
+		t.Fatalf("failed to decode response: %v", err)
+	}
+	if !response.IsError {
+		t.Error("expected isError")
+	}
+	if got := response.Content[0].Text; got != "Unknown tool: no_such_tool" {
+		t.Errorf("unexpected error text %q", got)
+	}
+}
+
+func TestCallHandlerWithoutTextAcceptReturnsJSON(t *testing.T) {
+	rr := postCall(t, MCPRequest{Name: "no_such_tool"}, "")
+
+	if got := rr.Header().Get("Content-Type"); got != "application/json" {
+		t.Errorf("expected application/json, got %q", got)
+	}
+
+	var response MCPResponse
+	if err := json.NewDecoder(rr.Body).Decode(&response); err != nil {
+		t.Fatalf("failed to decode response: %v", err)
+	}
+	if len(response.Content) != 1 || response.Content[0].Type != "text" {
+		t.Errorf("expected a single text content item, got %+v", response.Content)
+	}
+}
@@ -5,14 +5,23 @@ Provides access to Selin's knowledge base via MCP (Model Context Protocol)
 """
 
 import asyncio
+import atexit
+import functools
+import hashlib
 import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
 import sys
+import time
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 
 import httpx
-from mcp.server import Server
+import orjson
+from mcp.server import NotificationOptions, Server
 from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import (
@@ -24,191 +33,411 @@ from mcp.types import (
     Tool,
 )
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging. Records are queued and formatted/written to stderr by a
+# background listener thread so tool calls never block on it. The listener is
+# stopped at exit, after the event loop has shut down, so late records still
+# get flushed.
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Leave formatting to the listener thread
+        return record
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_stderr_handler = logging.StreamHandler(sys.stderr)
+_stderr_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+_log_listener = logging.handlers.QueueListener(_log_queue, _stderr_handler)
+logging.basicConfig(level=logging.INFO, handlers=[_DeferredQueueHandler(_log_queue)])
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("selin-mcp")
 
 # Selin API configuration
 SELIN_API_BASE = os.getenv("SELIN_API_BASE", "http://localhost:8084")
 
+# Response cache configuration (opt-in via SELIN_MCP_CACHE=1)
+CACHE_ENABLED = os.getenv("SELIN_MCP_CACHE") == "1"
+CACHE_MAX_SIZE = int(os.getenv("SELIN_MCP_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("SELIN_MCP_CACHE_TTL", "300"))
+
+# Request batching: a call made while another request to the Selin API is in
+# flight is queued, and calls queued within the window are sent as one
+# /mcp/batch request (SELIN_MCP_BATCH_WINDOW_MS=0 disables batching)
+BATCH_WINDOW = int(os.getenv("SELIN_MCP_BATCH_WINDOW_MS", "5")) / 1000.0
+# Largest batch the Selin API accepts (maxBatchSize in main.go)
+BATCH_LIMIT = 64
+BATCH_MAX = min(max(1, int(os.getenv("SELIN_MCP_BATCH_MAX", "16"))), BATCH_LIMIT)
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+CALL_HEADERS = {"Content-Type": "application/json", "Accept": "text/plain, application/json"}
+
+def dumps_json(obj: Any, sort_keys: bool = False) -> bytes:
+    """Encode obj as JSON with orjson, falling back to the stdlib for values
+    orjson rejects (e.g. integers outside the 64-bit range)"""
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else None)
+    except TypeError:
+        return json.dumps(obj, sort_keys=sort_keys, separators=(",", ":")).encode("utf-8")
+
+# HTTP/2 to the Selin API (opt-in via SELIN_HTTP2=1)
+HTTP2_ENABLED = os.getenv("SELIN_HTTP2") == "1"
+
+# Shared HTTP client, reused across tool calls so connections stay alive
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared HTTP client, creating it on first use"""
+    global _client
+    if _client is None:
+        # h2c needs prior knowledge, so HTTP/1.1 is switched off for plain http://
+        h2c = HTTP2_ENABLED and SELIN_API_BASE.startswith("http://")
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(30.0),
+            limits=httpx.Limits(
+                max_connections=100,
+                # HTTP/2 multiplexes calls over one connection; HTTP/1.1 needs more
+                max_keepalive_connections=20 if HTTP2_ENABLED else 50,
+                keepalive_expiry=300,
+            ),
+            http1=not h2c,
+            http2=HTTP2_ENABLED,
+        )
+    return _client
+
+async def close_http_client():
+    """Close the shared HTTP client on shutdown"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+# Claude-facing tool name -> Selin API tool name
+TOOL_MAP = {
+    "search_selin_content": "search_content",
+    "get_learning_progress": "get_learning_progress",
+    "get_recent_content": "get_recent_content",
+    "analyze_content_trends": "analyze_content_trends",
+}
+
+# Tools exposed to Claude, built once at import
+_TOOLS: List[Tool] = [
+    Tool(
+        name="search_selin_content",
+        description="Search Selin's knowledge base for content related to Go, blockchain, or cryptography",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Search query (e.g., 'golang concurrency', 'cosmos blockchain')"
+                },
+                "limit": {
+                    "type": "number",
+                    "description": "Maximum number of results to return",
+                    "default": 10
+                },
+                "platform": {
+                    "type": "string", 
+                    "description": "Filter by source platform",
+                    "enum": ["reddit", "slack", "file_upload", "all"],
+                    "default": "all"
+                }
+            },
+            "required": ["query"]
+        }
+    ),
+    Tool(
+        name="get_learning_progress",
+        description="Get the user's learning progress for specific topics",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "topic": {
+                    "type": "string",
+                    "description": "Learning topic (e.g., 'golang', 'blockchain', 'cryptography')"
+                }
+            },
+            "required": ["topic"]
+        }
+    ),
+    Tool(
+        name="get_recent_content", 
+        description="Get recently collected content from Selin's knowledge base",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "hours": {
+                    "type": "number",
+                    "description": "Number of hours back to look",
+                    "default": 24
+                },
+                "platform": {
+                    "type": "string",
+                    "description": "Filter by source platform", 
+                    "enum": ["reddit", "slack", "file_upload", "all"],
+                    "default": "all"
+                }
+            }
+        }
+    ),
+    Tool(
+        name="analyze_content_trends",
+        description="Analyze trends in collected content and learning topics",
+        inputSchema={
+            "type": "object", 
+            "properties": {
+                "days": {
+                    "type": "number",
+                    "description": "Number of days to analyze",
+                    "default": 7
+                },
+                "topic": {
+                    "type": "string",
+                    "description": "Focus on specific topic"
+                }
+            }
+        }
+    )
+]
+
+class ResponseCache:
+    """Small TTL + LRU cache for tool responses"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+
+    @staticmethod
+    def make_key(name: str, args: Dict[str, Any]) -> bytes:
+        payload = dumps_json({"n": name, "a": args}, sort_keys=True)
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: bytes, value: str):
+        # Jitter the TTL so entries cached together don't all expire together
+        ttl = self.ttl * random.uniform(0.9, 1.1)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
 class SelinMCPServer:
     def __init__(self):
         self.server = Server("selin")
+        self.cache = ResponseCache(CACHE_MAX_SIZE, CACHE_TTL) if CACHE_ENABLED else None
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+        self._batch_queue: List[tuple] = []
+        self._batch_flush: Optional[asyncio.TimerHandle] = None
+        self._batch_tasks: set = set()
+        self._backend_inflight = 0
+        self._dispatch = {
+            tool: functools.partial(self._call_backend, backend_name)
+            for tool, backend_name in TOOL_MAP.items()
+        }
         self.setup_handlers()
+        self._init_opts = InitializationOptions(
+            server_name="selin",
+            server_version="1.0.0",
+            capabilities=self.server.get_capabilities(
+                notification_options=NotificationOptions(),
+                experimental_capabilities={}
+            )
+        )
     
     def setup_handlers(self):
         @self.server.list_tools()
         async def list_tools() -> List[Tool]:
             """List available Selin tools for Claude"""
-            return [
-                Tool(
-                    name="search_selin_content",
-                    description="Search Selin's knowledge base for content related to Go, blockchain, or cryptography",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "query": {
-                                "type": "string",
-                                "description": "Search query (e.g., 'golang concurrency', 'cosmos blockchain')"
-                            },
-                            "limit": {
-                                "type": "number",
-                                "description": "Maximum number of results to return",
-                                "default": 10
-                            },
-                            "platform": {
-                                "type": "string", 
-                                "description": "Filter by source platform",
-                                "enum": ["reddit", "slack", "file_upload", "all"],
-                                "default": "all"
-                            }
-                        },
-                        "required": ["query"]
-                    }
-                ),
-                Tool(
-                    name="get_learning_progress",
-                    description="Get the user's learning progress for specific topics",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "topic": {
-                                "type": "string",
-                                "description": "Learning topic (e.g., 'golang', 'blockchain', 'cryptography')"
-                            }
-                        },
-                        "required": ["topic"]
-                    }
-                ),
-                Tool(
-                    name="get_recent_content", 
-                    description="Get recently collected content from Selin's knowledge base",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "hours": {
-                                "type": "number",
-                                "description": "Number of hours back to look",
-                                "default": 24
-                            },
-                            "platform": {
-                                "type": "string",
-                                "description": "Filter by source platform", 
-                                "enum": ["reddit", "slack", "file_upload", "all"],
-                                "default": "all"
-                            }
-                        }
-                    }
-                ),
-                Tool(
-                    name="analyze_content_trends",
-                    description="Analyze trends in collected content and learning topics",
-                    inputSchema={
-                        "type": "object", 
-                        "properties": {
-                            "days": {
-                                "type": "number",
-                                "description": "Number of days to analyze",
-                                "default": 7
-                            },
-                            "topic": {
-                                "type": "string",
-                                "description": "Focus on specific topic"
-                            }
-                        }
-                    }
-                )
-            ]
+            return _TOOLS
 
         @self.server.call_tool()
         async def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
             """Handle tool calls from Claude"""
-            logger.info(f"Tool called: {name} with arguments: {arguments}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Tool called: %s with arguments: %s", name, arguments)
             
             try:
-                if name == "search_selin_content":
-                    result = await self.search_content(arguments)
-                elif name == "get_learning_progress":
-                    result = await self.get_learning_progress(arguments)
-                elif name == "get_recent_content":
-                    result = await self.get_recent_content(arguments)
-                elif name == "analyze_content_trends":
-                    result = await self.analyze_trends(arguments)
-                else:
+                handler = self._dispatch.get(name)
+                if handler is None:
                     raise ValueError(f"Unknown tool: {name}")
+                result = await handler(arguments)
                 
                 return CallToolResult(content=[TextContent(type="text", text=result)])
                 
             except Exception as e:
-                logger.error(f"Tool call failed: {e}")
+                logger.error("Tool call failed: %s", e)
                 return CallToolResult(
                     content=[TextContent(type="text", text=f"Error: {str(e)}")],
                     isError=True
                 )
 
-    async def search_content(self, args: Dict[str, Any]) -> str:
-        """Search Selin's content database"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SELIN_API_BASE}/mcp/call",
-                json={"name": "search_content", "arguments": args},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("isError"):
-                raise Exception(data["content"][0]["text"])
-            
-            return data["content"][0]["text"]
-
-    async def get_learning_progress(self, args: Dict[str, Any]) -> str:
-        """Get learning progress from Selin"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SELIN_API_BASE}/mcp/call",
-                json={"name": "get_learning_progress", "arguments": args},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("isError"):
-                raise Exception(data["content"][0]["text"])
-            
-            return data["content"][0]["text"]
-
-    async def get_recent_content(self, args: Dict[str, Any]) -> str:
-        """Get recent content from Selin"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SELIN_API_BASE}/mcp/call", 
-                json={"name": "get_recent_content", "arguments": args},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("isError"):
-                raise Exception(data["content"][0]["text"])
-            
-            return data["content"][0]["text"]
-
-    async def analyze_trends(self, args: Dict[str, Any]) -> str:
-        """Analyze content trends in Selin"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{SELIN_API_BASE}/mcp/call",
-                json={"name": "analyze_content_trends", "arguments": args},
-                timeout=30.0
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("isError"):
-                raise Exception(data["content"][0]["text"])
-            
-            return data["content"][0]["text"]
+    async def _call_backend(self, name: str, args: Dict[str, Any]) -> str:
+        """Forward a tool call to the Selin API, serving repeats from the cache
+        and sharing one request between concurrent identical calls"""
+        key = ResponseCache.make_key(name, args)
+
+        if self.cache is not None:
+            result = self.cache.get(key)
+            if result is not None:
+                logger.info("Cache HIT: %s", name)
+                return result
+            logger.info("Cache MISS: %s", name)
+
+        # The fetch runs in its own task so cancelling one caller never
+        # cancels the request other callers are waiting on
+        inflight = self._inflight.get(key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._fetch_and_cache(key, name, args))
+            self._inflight[key] = inflight
+            inflight.add_done_callback(functools.partial(self._inflight_done, key))
+
+        return await asyncio.shield(inflight)
+
+    async def _fetch_and_cache(self, key: bytes, name: str, args: Dict[str, Any]) -> str:
+        result = await self._fetch(name, args)
+        if self.cache is not None:
+            self.cache.set(key, result)
+        return result
+
+    def _inflight_done(self, key: bytes, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, name: str, args: Dict[str, Any]) -> str:
+        """Send a tool call to the Selin API, queueing it for the next batch
+        if other requests are already outstanding"""
+        if BATCH_WINDOW <= 0 or (not self._batch_queue and self._backend_inflight == 0):
+            self._backend_inflight += 1
+            try:
+                return await self._post_call(name, args)
+            finally:
+                self._backend_inflight -= 1
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._batch_queue.append((name, args, future))
+
+        if len(self._batch_queue) >= BATCH_MAX:
+            self._flush_batch()
+        elif self._batch_flush is None:
+            self._batch_flush = loop.call_later(BATCH_WINDOW, self._flush_batch)
+
+        return await future
+
+    def _flush_batch(self):
+        """Send all queued tool calls in a background task"""
+        if self._batch_flush is not None:
+            self._batch_flush.cancel()
+            self._batch_flush = None
+
+        batch, self._batch_queue = self._batch_queue, []
+        if not batch:
+            return
+
+        task = asyncio.create_task(self._send_batch(batch))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, batch: List[tuple]):
+        """POST queued tool calls and resolve each caller's future"""
+        self._backend_inflight += 1
+        try:
+            try:
+                if len(batch) == 1:
+                    name, args, _ = batch[0]
+                    results = [await self._post_call(name, args)]
+                else:
+                    results = await self._post_batch([(name, args) for name, args, _ in batch])
+            except Exception as e:
+                results = [self._batch_error(e) for _ in batch] if len(batch) > 1 else [e]
+
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._backend_inflight -= 1
+            # Don't leave callers waiting forever if this task was cancelled
+            for _, _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    @staticmethod
+    def _batch_error(error: Exception) -> Exception:
+        """A separate exception for one caller of a failed batch, so callers
+        don't share (and keep extending) a single traceback"""
+        caller_error = Exception(str(error))
+        caller_error.__cause__ = error
+        return caller_error
+
+    async def _post_call(self, name: str, args: Dict[str, Any]) -> str:
+        """POST a single tool call to the Selin API"""
+        client = get_client()
+        response = await client.post(
+            f"{SELIN_API_BASE}/mcp/call",
+            content=dumps_json({"name": name, "arguments": args}),
+            headers=CALL_HEADERS,
+        )
+        if response.headers.get("x-selin-error"):
+            data = orjson.loads(response.content)
+            raise Exception(data["content"][0]["text"])
+        response.raise_for_status()
+
+        # Successful calls come back as plain text unless the API predates that
+        if response.headers.get("content-type", "").startswith("application/json"):
+            return self._result_text(orjson.loads(response.content))
+        return response.text
+
+    async def _post_batch(self, calls: List[tuple]) -> List[Any]:
+        """POST several tool calls to the Selin API in one request.
+        Returns the text or exception for each call, in order."""
+        client = get_client()
+        response = await client.post(
+            f"{SELIN_API_BASE}/mcp/batch",
+            content=dumps_json({"batch": [{"name": name, "arguments": args} for name, args in calls]}),
+            headers=JSON_HEADERS,
+        )
+        if response.headers.get("x-selin-error"):
+            data = orjson.loads(response.content)
+            raise Exception(data["content"][0]["text"])
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+
+        results = data.get("results") or []
+        if len(results) != len(calls):
+            raise Exception(f"Batch returned {len(results)} results for {len(calls)} calls")
+
+        out: List[Any] = []
+        for item in results:
+            try:
+                out.append(self._result_text(item))
+            except Exception as e:
+                out.append(e)
+        return out
+
+    @staticmethod
+    def _result_text(data: Dict[str, Any]) -> str:
+        """Extract the text of an MCP response, raising if it is an error"""
+        if data.get("isError"):
+            raise Exception(data["content"][0]["text"])
+        
+        return data["content"][0]["text"]
 
     async def run(self):
         """Run the MCP server"""
@@ -216,21 +445,26 @@ class SelinMCPServer:
             await self.server.run(
                 read_stream,
                 write_stream, 
-                InitializationOptions(
-                    server_name="selin",
-                    server_version="1.0.0",
-                    capabilities=self.server.get_capabilities(
-                        notification_options=None,
-                        experimental_capabilities=None
-                    )
-                )
+                self._init_opts
             )
 
 async def main():
     """Main entry point"""
     logger.info("Starting Selin MCP Server...")
     server = SelinMCPServer()
-    await server.run()
+    try:
+        await server.run()
+    finally:
+        await close_http_client()
+
+def run_main():
+    """Run main() on uvloop when it is available"""
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main())
+        return
+    uvloop.run(main())
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    run_main()
@@ -0,0 +1,292 @@
+import asyncio
+import importlib.util
+import os
+import unittest
+from unittest import mock
+
+import httpx
+import orjson
+
+_spec = importlib.util.spec_from_file_location(
+    "selin_mcp", os.path.join(os.path.dirname(__file__), "selin-mcp.py")
+)
+selin_mcp = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(selin_mcp)
+
+
+class SelinMCPTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs SelinMCPServer against a mock Selin API"""
+
+    batch_window = 0.0
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.handler = None
+        patcher = mock.patch.object(selin_mcp, "BATCH_WINDOW", self.batch_window)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        selin_mcp._client = httpx.AsyncClient(transport=httpx.MockTransport(self._handle))
+        self.server = selin_mcp.SelinMCPServer()
+
+    async def asyncTearDown(self):
+        await selin_mcp.close_http_client()
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return await self.handler(request)
+
+
+class TestSingleFlight(SelinMCPTestCase):
+    async def test_concurrent_identical_calls_share_one_request(self):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, text="result")
+        self.handler = handler
+
+        results = await asyncio.gather(
+            *[self.server._call_backend("search_content", {"query": "go"}) for _ in range(5)]
+        )
+
+        self.assertEqual(results, ["result"] * 5)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(self.server._inflight, {})
+
+    async def test_cancelled_first_caller_does_not_cancel_followers(self):
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, text="result")
+        self.handler = handler
+
+        first = asyncio.create_task(self.server._call_backend("search_content", {"query": "go"}))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(self.server._call_backend("search_content", {"query": "go"}))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await second, "result")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(len(self.requests), 1)
+
+
+class TestCache(SelinMCPTestCase):
+    async def asyncSetUp(self):
+        # The cache is created in SelinMCPServer.__init__, so patch before it runs
+        for name, value in (("CACHE_ENABLED", True), ("CACHE_MAX_SIZE", 2), ("CACHE_TTL", 0.05)):
+            patcher = mock.patch.object(selin_mcp, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        await super().asyncSetUp()
+        self.handler = self._echo_query
+
+    async def _echo_query(self, request):
+        return httpx.Response(200, text=orjson.loads(request.content)["arguments"]["query"])
+
+    def _call(self, query):
+        return self.server._call_backend("search_content", {"query": query})
+
+    async def test_repeated_calls_hit_the_cache(self):
+        self.assertEqual(await self._call("a"), "a")
+        self.assertEqual(await self._call("a"), "a")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_concurrent_callers_are_served_by_one_fetch(self):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return await self._echo_query(request)
+        self.handler = handler
+
+        self.assertEqual(await asyncio.gather(*[self._call("a") for _ in range(3)]), ["a"] * 3)
+        # The winner stored the result before waking the others
+        self.assertEqual(await self._call("a"), "a")
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_entries_expire_after_ttl(self):
+        await self._call("a")
+        # Past the TTL even with the +10% jitter
+        await asyncio.sleep(0.08)
+        await self._call("a")
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_least_recently_used_entry_is_evicted(self):
+        await self._call("a")
+        await self._call("b")
+        await self._call("a")  # "b" is now least recently used
+        await self._call("c")
+        self.assertEqual(len(self.requests), 3)
+
+        await self._call("a")
+        self.assertEqual(len(self.requests), 3)
+        await self._call("b")
+        self.assertEqual(len(self.requests), 4)
+
+    async def test_server_errors_are_not_cached(self):
+        async def handler(request):
+            return httpx.Response(500)
+        self.handler = handler
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self._call("a")
+        self.handler = self._echo_query
+        self.assertEqual(await self._call("a"), "a")
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_selin_errors_are_not_cached(self):
+        async def handler(request):
+            return httpx.Response(
+                200,
+                headers={"X-Selin-Error": "1"},
+                json={"content": [{"type": "text", "text": "database down"}], "isError": True},
+            )
+        self.handler = handler
+
+        with self.assertRaisesRegex(Exception, "database down"):
+            await self._call("a")
+        self.handler = self._echo_query
+        self.assertEqual(await self._call("a"), "a")
+        self.assertEqual(len(self.requests), 2)
+
+
+class TestEncoding(SelinMCPTestCase):
+    async def test_arguments_outside_64_bit_range_are_sent(self):
+        async def handler(request):
+            return httpx.Response(200, text=request.content.decode())
+        self.handler = handler
+
+        result = await self.server._call_backend("search_content", {"query": "go", "limit": 2**70})
+
+        self.assertEqual(orjson.loads(result)["arguments"]["limit"], 2**70)
+        self.assertEqual(
+            selin_mcp.ResponseCache.make_key("search_content", {"limit": 2**70, "query": "go"}),
+            selin_mcp.ResponseCache.make_key("search_content", {"query": "go", "limit": 2**70}),
+        )
+
+
+def _echo_batch(request: httpx.Request) -> httpx.Response:
+    batch = orjson.loads(request.content)["batch"]
+    return httpx.Response(200, json={"results": [
+        {"content": [{"type": "text", "text": f"{call['name']}:{call['arguments']['query']}"}]}
+        for call in batch
+    ]})
+
+
+class TestBatching(SelinMCPTestCase):
+    batch_window = 0.01
+
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.handler = self._echo
+
+    async def _echo(self, request):
+        # Stay in flight long enough for later calls to be queued behind this one
+        await asyncio.sleep(0.01)
+        if request.url.path == "/mcp/batch":
+            return _echo_batch(request)
+        return httpx.Response(200, text="single:" + orjson.loads(request.content)["arguments"]["query"])
+
+    def _calls(self, *queries):
+        return [self.server._call_backend("search_content", {"query": q}) for q in queries]
+
+    async def test_call_with_nothing_in_flight_is_sent_immediately(self):
+        with mock.patch.object(selin_mcp, "BATCH_WINDOW", 10.0):
+            result = await asyncio.wait_for(self.server._call_backend("search_content", {"query": "a"}), 1.0)
+
+        self.assertEqual(result, "single:a")
+        self.assertEqual([r.url.path for r in self.requests], ["/mcp/call"])
+
+    async def test_sequential_calls_are_not_batched(self):
+        for query in ("a", "b"):
+            await self.server._call_backend("search_content", {"query": query})
+
+        self.assertEqual([r.url.path for r in self.requests], ["/mcp/call", "/mcp/call"])
+
+    async def test_calls_made_while_one_is_in_flight_share_one_batch(self):
+        results = await asyncio.gather(*self._calls("a", "b", "c", "d"))
+
+        self.assertEqual(results, ["single:a", "search_content:b", "search_content:c", "search_content:d"])
+        self.assertEqual([r.url.path for r in self.requests], ["/mcp/call", "/mcp/batch"])
+
+    async def test_full_batch_is_sent_without_waiting_for_window(self):
+        with mock.patch.object(selin_mcp, "BATCH_MAX", 2):
+            results = await asyncio.gather(*self._calls("a", "b", "c", "d"))
+
+        self.assertEqual(results, ["single:a", "search_content:b", "search_content:c", "single:d"])
+        # "d" is sent alone when its window closes, which goes to /mcp/call
+        self.assertEqual([r.url.path for r in self.requests], ["/mcp/call", "/mcp/batch", "/mcp/call"])
+        self.assertEqual(len(orjson.loads(self.requests[1].content)["batch"]), 2)
+
+    async def test_per_call_errors_only_fail_that_call(self):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            if request.url.path == "/mcp/call":
+                return httpx.Response(200, text="first")
+            return httpx.Response(200, json={"results": [
+                {"content": [{"type": "text", "text": "ok"}]},
+                {"content": [{"type": "text", "text": "bad query"}], "isError": True},
+            ]})
+        self.handler = handler
+
+        results = await asyncio.gather(*self._calls("a", "b", "c"), return_exceptions=True)
+
+        self.assertEqual(results[:2], ["first", "ok"])
+        self.assertEqual(str(results[2]), "bad query")
+
+    async def test_batch_failure_fails_every_call(self):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return httpx.Response(503)
+        self.handler = handler
+
+        results = await asyncio.gather(*self._calls("a", "b", "c"), return_exceptions=True)
+
+        self.assertEqual([r.url.path for r in self.requests], ["/mcp/call", "/mcp/batch"])
+        self.assertIsInstance(results[0], httpx.HTTPStatusError)
+        for result in results[1:]:
+            self.assertIsInstance(result.__cause__, httpx.HTTPStatusError)
+        # Each batched caller gets its own exception object
+        self.assertIsNot(results[1], results[2])
+
+    async def test_batch_error_message_is_surfaced(self):
+        async def handler(request):
+            await asyncio.sleep(0.01)
+            return httpx.Response(
+                400,
+                headers={"X-Selin-Error": "1"},
+                json={"content": [{"type": "text", "text": "Batch exceeds maximum size of 64"}], "isError": True},
+            )
+        self.handler = handler
+
+        results = await asyncio.gather(*self._calls("a", "b", "c"), return_exceptions=True)
+
+        for result in results:
+            self.assertEqual(str(result), "Batch exceeds maximum size of 64")
+
+    async def test_cancelled_batch_cancels_waiting_callers(self):
+        release = asyncio.Event()
+
+        async def handler(request):
+            await release.wait()
+            return httpx.Response(200, text="first")
+        self.handler = handler
+
+        tasks = [asyncio.create_task(call) for call in self._calls("a", "b", "c")]
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(self.server._batch_tasks), 1)
+        for task in self.server._batch_tasks:
+            task.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.assertEqual(results[0], "first")
+        for result in results[1:]:
+            self.assertIsInstance(result, asyncio.CancelledError)
+
+
+if __name__ == "__main__":
+    unittest.main()